@@ -23,6 +23,8 @@ BTN_CLOSE = 'btn_em_close'
 BTN_NEW_TAB = 'to_new_tab'
 
 OPT_SECTION = 'embedded_editor'
+SWEEP_INTERVAL = 10000 # ms, period of checking for `Hint`s of closed editors
+SWEEP_CALLBACK = 'module=cuda_embed_ed;cmd=on_sweep;'
 GAP_TAG = app_proc(PROC_GET_UNIQUE_TAG, '')
 USER_DIR = os.path.expanduser('~')
 
@@ -167,19 +169,25 @@ class Command:
 
 
     def on_close_pre(self, ed_self):
-        """ if closed Editor has 'embed' with unsaved text - give prompt to save|cancel|ignore
+        """ if closed tab's Editors have 'embed' with unsaved text - give prompt to save|cancel|ignore
         """
-        embed = self._get_ed_embed(ed_self)
-        if embed  and  embed.is_visible:
-            if embed.text_modified:
-                cancel_close = embed.save_text(force=False)
-                if cancel_close:
-                    return False    # "return false to cancel closing"
-
-            # did not cancel 'close' -> destroy embed
-            embed.hide(animate=False, skip_save=True) # destroy dialog
-            h_ed = ed_self.get_prop(PROP_HANDLE_SELF)
-            del self._ed_hints[h_ed] # destroy `Hint` object
+        for prop in (PROP_HANDLE_PRIMARY, PROP_HANDLE_SECONDARY):
+            embed = self._ed_hints.get(ed_self.get_prop(prop))
+            if embed  and  embed.is_visible:
+                if embed.text_modified:
+                    cancel_close = embed.save_text(force=False)
+                    if cancel_close:
+                        return False    # "return false to cancel closing"
+
+    def on_close(self, ed_self):
+        """ tab is closed for sure -> destroy 'embed's of its Editors
+        """
+        for prop in (PROP_HANDLE_PRIMARY, PROP_HANDLE_SECONDARY):
+            h_ed = ed_self.get_prop(prop)
+            if h_ed in self._ed_hints:
+                # gap holds the dialog, remove it before freeing the dialog
+                Editor(h_ed).gap(GAP_DELETE_BY_TAG, 0, 0, tag=GAP_TAG)
+                self._free_embed(h_ed)
 
     # callback proxy for dialog buttons
     def on_dlg_btn(self, id_dlg, id_ctl, data='', info=''):
@@ -193,6 +201,40 @@ class Command:
         if embed  and  embed.is_visible:
             embed.restore_scroll_pos(delay=False)
 
+    # timer callback
+    def on_sweep(self, data='', info=''):
+        self._sweep()
+
+    def _sweep(self):
+        """ drop `Hint`s of editors, which are no longer opened. Fallback for the
+            case when Editor is destroyed without `on_close` reaching this plugin
+            (e.g. exception in `on_close` of other plugin).
+            Dialogs are not freed: they are destroyed with their parent Editor.
+        """
+        for h_ed in self._get_stale_handles():
+            self._free_embed(h_ed, dialogs=False)
+
+    def _get_stale_handles(self):
+        """ returns: set of handles in `_ed_hints` of editors, which are not in any tab
+        """
+        live_handles = set()
+        for h in ed_handles():
+            _ed = Editor(h)
+            live_handles.add(_ed.get_prop(PROP_HANDLE_PRIMARY))
+            live_handles.add(_ed.get_prop(PROP_HANDLE_SECONDARY))
+
+        return {h_ed for h_ed in self._ed_hints  if h_ed not in live_handles}
+
+    def _free_embed(self, h_ed, dialogs=True):
+        """ release all resources of the `Hint` for Editor handle `h_ed`
+        """
+        embed = self._ed_hints.pop(h_ed, None)
+        if embed:
+            embed.free(dialogs=dialogs)
+
+        if not self._ed_hints:
+            timer_proc(TIMER_STOP, SWEEP_CALLBACK, 0)
+
     def _get_caret_filepath(self, caret_x, caret_y):
         """ find matching pattern in line under caret, extract file-path
         """
@@ -219,11 +261,13 @@ class Command:
         h_ed = _ed.get_prop(PROP_HANDLE_SELF)
 
         if h_ed not in self._ed_hints  and  create:
+            if not self._ed_hints:
+                timer_proc(TIMER_START, SWEEP_CALLBACK, SWEEP_INTERVAL)
             self._ed_hints[h_ed] = Hint()
 
         return self._ed_hints.get(h_ed)
 
-    def _open_file(self, embed, full_path, nline, caption=None):
+    def _open_file(self, full_path, nline, caption=None, scroll_to=None, carets=None):
         file_exists = os.path.exists(full_path)
         if not file_exists:
             is_windows = not app_proc(PROC_GET_OS_SUFFIX, '') # empty => windows
@@ -235,6 +279,12 @@ class Command:
                     file_exists = True
 
         if file_exists:
+            embed = self._get_ed_embed(ed, create=True)
+            if scroll_to:
+                embed.set_scroll_pos(full_path, scroll_to)
+            if carets:
+                embed.set_carets(full_path, carets)
+
             embed.show(full_path, nline=nline, caption=caption)
 
             msg_status(_("Opened '{}' in embedded editor, encoding '{}'").format(caption or full_path, embed.embed_enc))
@@ -244,10 +294,10 @@ class Command:
 
     # menu command
     def toggle(self):
-        embed = self._get_ed_embed(ed, create=True)
+        embed = self._get_ed_embed(ed)
 
         # hiding #####
-        if embed.is_visible:
+        if embed  and  embed.is_visible:
             embed.hide()
         # showing #####
         else:
@@ -266,7 +316,32 @@ class Command:
                 return
             full_path = os.path.join(os.path.dirname(ed_fn), path_str)
 
-            self._open_file(embed, full_path, nline=caret_y, caption=path_str)
+            self._open_file(full_path, nline=caret_y, caption=path_str)
+
+
+    # menu command
+    def show_stats(self):
+        """ print counts of live per-editor objects to the Console
+        """
+        stale_handles = self._get_stale_handles()
+        embeds = self._ed_hints.values()
+        # dialogs of stale `Hint`s can be destroyed with their Editor, dont query them
+        live_embeds =   [embed for h_ed,embed in self._ed_hints.items()  if h_ed not in stale_handles]
+        stale_embeds =  [embed for h_ed,embed in self._ed_hints.items()  if h_ed in stale_handles]
+        stats = (
+            (_('Editors with embed'),           len(self._ed_hints)),
+            (_('Stale (not in any tab)'),       len(stale_handles)),
+            (_('Visible embeds'),               sum(1 for embed in live_embeds  if embed.is_visible)),
+            (_('Dialogs'),                      sum(embed.dialog_count for embed in live_embeds)),
+            (_('Dialog handles of stale'),      sum(embed.dialog_count for embed in stale_embeds)),
+            (_('Scroll positions'),             sum(embed.scroll_pos_count for embed in embeds)),
+            (_('Pending carets'),               sum(embed.carets_count for embed in embeds)),
+            (_('Cached lexers'),                len(_lex_cache)),
+        )
+        print(_('Embedded Editor stats:'))
+        for name,count in stats:
+            print('  {}: {}'.format(name, count))
+        msg_status(_('Embedded Editor stats are printed to the Console'))
 
 
     def open_file(self):
@@ -278,17 +353,12 @@ class Command:
         scroll_to = j['scroll_to']
         carets =    j['carets']
 
-        embed = self._get_ed_embed(ed, create=True)
+        embed = self._get_ed_embed(ed)
 
-        if embed.is_visible:    # hide old if open
+        if embed  and  embed.is_visible:    # hide old if open
             embed.hide()
 
-        if scroll_to:
-            embed.set_scroll_pos(full_path, scroll_to)
-        if carets:
-            embed.set_carets(full_path, carets)
-
-        self._open_file(embed, full_path, nline=nline, caption=caption)
+        self._open_file(full_path, nline=nline, caption=caption, scroll_to=scroll_to, carets=carets)
 
 
 
@@ -317,6 +387,20 @@ class Hint:
             return False
         return dlg_proc(self.h, DLG_PROP_GET)['vis']
 
+    @property
+    def dialog_count(self):
+        """ number of not freed dialogs: shown one and the one, parked for freeing
+        """
+        return (self.h is not None) + (self._h_to_free is not None)
+
+    @property
+    def scroll_pos_count(self):
+        return len(self._scroll_poss)
+
+    @property
+    def carets_count(self):
+        return len(self._carets)
+
     @property
     def text_modified(self):
         return self.ed.get_prop(PROP_MODIFIED)
@@ -630,6 +714,22 @@ class Hint:
 
         ed.focus()
 
+    def free(self, dialogs=True):
+        """ free dialogs and forget saved positions; gap holding the dialog
+            must be removed before this.
+            dialogs - False: only forget dialog handles, when parent Editor is already destroyed
+        """
+        if dialogs:
+            for h in (self.h, self._h_to_free):
+                if h is not None:
+                    dlg_proc(h, DLG_FREE)
+        self.h = None
+        self._h_to_free = None
+        self._enabled = False
+
+        self._scroll_poss.clear()
+        self._carets.clear()
+
     def save_scroll_pos(self):
         if self.full_path and self.h:
             scrol_pos = (